@@ -1,4 +1,6 @@
+import io
 import os
+import tempfile
 # Set the DATABASE_URL environment variable to use SQLite test database
 os.environ['DATABASE_URL'] = 'sqlite:///test.db'
 import pytest
@@ -6,7 +8,9 @@ from web import app, db
 from web.models.User import User 
 from web.models.UserWeightOverTime import UserWeightOverTime 
 from web.models.UserCalories import UserCalories 
-from web.urls import calculate_calories
+from web.urls import calculate_calories, save_picture, _store_picture, picture_executor
+from PIL import Image
+from werkzeug.datastructures import FileStorage
 
 @pytest.fixture
 def test_client():
@@ -39,12 +43,17 @@ def test_client():
 @pytest.fixture
 def test_user():
     """
-    Create a test user to be used in other tests
+    Create a test user to be used in other tests, and drop it with the tables afterwards
     """
+    db.create_all()
     user = User(name='TestUser', email='testuser@example.com', password='testpassword')
     db.session.add(user)
     db.session.commit()
-    return user
+
+    yield user
+
+    db.session.remove()
+    db.drop_all()
 
 def test_calculate_calories(test_user):
     """
@@ -66,6 +75,30 @@ def test_calculate_calories(test_user):
     calories = calculate_calories(test_user)
     assert calories == 2237
 
+def test_calculate_calories_female(test_user):
+    """
+    Test the calculate_calories function for a female user with a weight loss goal
+
+    Params:
+        test_user: A test user
+
+    Returns:
+        None
+    """
+    test_user.gender = 'Female'
+    test_user.age = 30
+    test_user.height = 165
+    test_user.weight = 60
+    test_user.goal = 'Lose Weight'
+    test_user.activity_level = 'Moderately Active'
+
+    calories = calculate_calories(test_user)
+    assert calories == 1660
+
+    test_user.gender = None
+    with pytest.raises(ValueError):
+        calculate_calories(test_user)
+
 def test_account_calories_update(test_user):
     """
     Tests if calories are updated when user changes weight, goal or activity level
@@ -149,4 +182,50 @@ def test_account_weight_history(test_user):
 
         updated_weight_history = UserWeightOverTime.query.filter_by(user_id=test_user.id).all()
         assert len(updated_weight_history) == 2
-        assert updated_weight_history[1].weight == 85
\ No newline at end of file
+        assert updated_weight_history[1].weight == 85
+
+def test_save_picture():
+    """
+    Tests that an uploaded profile picture is saved as a thumbnail
+
+    Returns:
+        None
+    """
+    image_bytes = io.BytesIO()
+    Image.new('RGB', (1200, 900), color='red').save(image_bytes, 'JPEG')
+    image_bytes.seek(0)
+    form_picture = FileStorage(stream=image_bytes, filename='photo.jpg')
+
+    picture_fn = save_picture(form_picture)
+    picture_path = os.path.join(app.root_path, 'static/images', picture_fn)
+    try:
+        assert picture_fn.endswith('.jpg')
+        with Image.open(picture_path) as thumbnail:
+            assert max(thumbnail.size) == 125
+    finally:
+        os.remove(picture_path)
+
+
+def test_store_picture(test_user):
+    """
+    Tests that a queued profile picture is thumbnailed and set on the user in the background
+
+    Params:
+        test_user: A test user
+
+    Returns:
+        None
+    """
+    fd, upload_path = tempfile.mkstemp(suffix='.jpg')
+    with os.fdopen(fd, 'wb') as upload:
+        Image.new('RGB', (1200, 900), color='blue').save(upload, 'JPEG')
+
+    picture_executor.submit(_store_picture, upload_path, test_user.id).result()
+    db.session.refresh(test_user)
+    picture_path = os.path.join(app.root_path, 'static/images', test_user.image_file)
+    try:
+        assert test_user.image_file != 'default.jpg'
+        assert os.path.exists(picture_path)
+        assert not os.path.exists(upload_path)
+    finally:
+        os.remove(picture_path)
@@ -1,7 +1,7 @@
 import pytest
 from sqlalchemy.exc import IntegrityError
 from web import db, app
-from web.models.User import User
+from web.models.User import User, normalize_stored_emails
 from web.models.UserWeightOverTime import UserWeightOverTime
 from web.models.UserCaloriesOverTime import UserCaloriesOverTime
 from web.models.UserCalories import UserCalories
@@ -13,7 +13,7 @@ from web.models.UserCurrentDiet import UserCurrentDiet
 from web.models.UserCurrentDietMeals import UserCurrentDietMeals
 from web.models.DietCalories import DietCalories
 
-@pytest.fixture(scope='module')
+@pytest.fixture
 def test_app():
     """
     Create a test client for the app
@@ -123,4 +123,58 @@ def test_user_history(test_app):
     assert fetched_user_history.user == user
 
 
+def test_user_is_profile_complete(test_app):
+    """
+    Test the is_profile_complete property of a user
+
+    Params:
+        test_app: A test app
+
+    Returns:
+        None
+    """
+    user = User(name='Jane Doe', email='jane.doe@example.com', password='testpassword')
+    db.session.add(user)
+    db.session.commit()
+    assert not user.is_profile_complete
+
+    user.height = 170
+    user.weight = 60
+    user.age = 25
+    user.goal = 'Maintain Weight'
+    user.activity_level = 'Sedentary'
+    user.gender = 'Female'
+    db.session.commit()
+    assert user.is_profile_complete
+
+
+def test_normalize_stored_emails(test_app):
+    """
+    Test that emails stored before they were lowercased are normalized, and that accounts
+    whose email only differs by case are left unchanged
+
+    Params:
+        test_app: A test app
+
+    Returns:
+        None
+    """
+    users = [User(name='Legacy', email='legacy@example.com', password='testpassword'),
+             User(name='Taken', email='taken@example.com', password='testpassword'),
+             User(name='Duplicate', email='duplicate@example.com', password='testpassword')]
+    db.session.add_all(users)
+    db.session.commit()
+    # write the old mixed case emails directly, the model would normalize them otherwise
+    user_table = User.__table__
+    db.session.execute(user_table.update().where(user_table.c.id == users[0].id).values(email=' Legacy@Example.com'))
+    db.session.execute(user_table.update().where(user_table.c.id == users[2].id).values(email='Taken@Example.com'))
+    db.session.commit()
+
+    assert normalize_stored_emails() == 1
+    assert db.session.query(User.email).filter_by(id=users[0].id).scalar() == 'legacy@example.com'
+    assert db.session.query(User.email).filter_by(id=users[1].id).scalar() == 'taken@example.com'
+    assert db.session.query(User.email).filter_by(id=users[2].id).scalar() == 'Taken@Example.com'
+    assert normalize_stored_emails() == 0
+
+
 # To be continued
@@ -1,4 +1,6 @@
+import threading
 import pytest
+import web.urls
 from web import app, db, bcrypt
 from web.models.User import User
 from web.forms import RegistrationForm, LoginForm, CalculateCalories
@@ -167,4 +169,107 @@ def test_finish_account(client):
                                      goal='Lose Weight', activity_level='Sedentary', gender='Male'),
                            follow_redirects=True)
     assert response.status_code == 200
-    assert b'Show Meals' in response.data
\ No newline at end of file
+    assert b'Show Meals' in response.data
+
+# Test function for password hashing on register and login
+def test_password_hashing(client):
+    """
+    Test that new passwords are hashed with Argon2id and legacy bcrypt hashes are upgraded on login
+
+    Params:
+        client: A test client
+
+    Returns:
+        None
+    """
+    # New accounts are stored with an Argon2id hash
+    client.post('/register', data=dict(
+        name='New User', email='new_user@example.com', password='new_password', confirm_password='new_password'
+    ), follow_redirects=True)
+    new_user = User.query.filter_by(email='new_user@example.com').first()
+    assert new_user.password.startswith('$argon2id$')
+
+    # A user with a legacy bcrypt hash can still log in and gets rehashed
+    test_user = create_test_user()
+    assert test_user.password.startswith('$2')
+    response = client.post('/login', data=dict(
+        email='test@example.com', password='test_password'
+    ), follow_redirects=True)
+    assert b'Please complete your account details.' in response.data
+    assert User.query.get(test_user.id).password.startswith('$argon2id$')
+    client.get('/logout')
+
+    # The upgraded hash still accepts the same password and rejects a wrong one
+    response = client.post('/login', data=dict(
+        email='test@example.com', password='wrong_password'
+    ), follow_redirects=True)
+    assert b'Login Unsuccessful' in response.data
+    response = client.post('/login', data=dict(
+        email='test@example.com', password='test_password'
+    ), follow_redirects=True)
+    assert b'Please complete your account details.' in response.data
+
+
+# Test function for 'reset_request' route
+def test_reset_request(client, monkeypatch):
+    """
+    Test that the 'reset_request' route sends the email in the background and doesn't reveal unknown emails
+
+    Params:
+        client: A test client
+        monkeypatch: The pytest monkeypatch fixture
+
+    Returns:
+        None
+    """
+    sent = []
+    email_sent = threading.Event()
+
+    def record_email(app, msg):
+        sent.append(msg)
+        email_sent.set()
+
+    monkeypatch.setattr(web.urls, '_send_email', record_email)
+    create_test_user()
+
+    # An unknown email gets the same response, and no email is sent
+    response = client.post('/reset-password', data=dict(email='unknown@example.com'), follow_redirects=True)
+    assert response.status_code == 200
+    assert b'If an account exists for that email' in response.data
+    assert sent == []
+
+    # A known email gets the reset link sent from a background thread
+    response = client.post('/reset-password', data=dict(email='test@example.com'), follow_redirects=True)
+    assert response.status_code == 200
+    assert b'If an account exists for that email' in response.data
+    assert email_sent.wait(timeout=5)
+    assert sent[0].recipients == ['test@example.com']
+
+
+# Test function for email normalization
+def test_email_normalization(client):
+    """
+    Test that emails are stored lowercased and can be used to log in regardless of case
+
+    Params:
+        client: A test client
+
+    Returns:
+        None
+    """
+    client.post('/register', data=dict(
+        name='Mixed Case', email=' Mixed.Case@Example.com ', password='new_password', confirm_password='new_password'
+    ), follow_redirects=True)
+    user = User.query.filter_by(email='mixed.case@example.com').first()
+    assert user is not None
+
+    # registering again with a different case is rejected as a duplicate
+    response = client.post('/register', data=dict(
+        name='Mixed Case', email='MIXED.CASE@example.com', password='new_password', confirm_password='new_password'
+    ), follow_redirects=True)
+    assert b'That email is taken' in response.data
+
+    response = client.post('/login', data=dict(
+        email='MIXED.case@EXAMPLE.com', password='new_password'
+    ), follow_redirects=True)
+    assert b'Please complete your account details.' in response.data
@@ -1,8 +1,12 @@
+import datetime
 import pytest
+import web.urls
 from web import app, db, bcrypt
 from web.models.User import User 
 from web.models.Meals import Meals 
 from web.models.MealsLabel import MealsLabel 
+from web.models.UserWeightOverTime import UserWeightOverTime
+from web.urls import _chart_points
 from flask import url_for
 
 @pytest.fixture
@@ -155,4 +159,32 @@ def test_show_weight(client, test_meals):
     for time_frame in time_frames:
         response = client.post('/show-weight', data=dict(time=time_frame), follow_redirects=True)
         assert response.status_code == 200
-        assert bytes(time_frame, 'utf-8') in response.data
\ No newline at end of file
+        assert bytes(time_frame, 'utf-8') in response.data
+
+def test_chart_points(client, monkeypatch):
+    """
+    Test that chart points are returned oldest first and capped to the most recent ones
+
+    Params:
+        client: The test client
+        monkeypatch: The pytest monkeypatch fixture
+
+    Returns:
+        None
+    """
+    test_user = create_test_user()
+    for day, weight in enumerate([80, 79, 78]):
+        db.session.add(UserWeightOverTime(user_id=test_user.id, weight=weight,
+                                          created_at=datetime.datetime(2023, 5, day + 1)))
+    db.session.commit()
+
+    labels, values = _chart_points(UserWeightOverTime.created_at, UserWeightOverTime.weight,
+                                   UserWeightOverTime.user_id == test_user.id)
+    assert labels == ['05/01', '05/02', '05/03']
+    assert values == [80, 79, 78]
+
+    monkeypatch.setattr(web.urls, 'MAX_CHART_POINTS', 2)
+    labels, values = _chart_points(UserWeightOverTime.created_at, UserWeightOverTime.weight,
+                                   UserWeightOverTime.user_id == test_user.id)
+    assert labels == ['05/02', '05/03']
+    assert values == [79, 78]
@@ -1,6 +1,7 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from argon2 import PasswordHasher
 from flask_login import LoginManager
 from dotenv import load_dotenv
 import os
@@ -12,10 +13,23 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'postgresql://cs162_user:cs162_password@db/cs162')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# size the connection pool for concurrent requests, SQLite keeps its default pools
+# (Flask-SQLAlchemy already uses a StaticPool for in-memory SQLite databases)
+if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
+# bcrypt work factor, each extra round doubles the hashing time (12 rounds is ~250 ms)
+app.config['BCRYPT_LOG_ROUNDS'] = 12
 
 # app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 bcrypt = Bcrypt(app)
+# new passwords are hashed with Argon2id, bcrypt is only kept to verify legacy hashes
+password_hasher = PasswordHasher(time_cost=2, memory_cost=64*1024, parallelism=1)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
@@ -27,5 +41,8 @@ app.config['MAIL_PASSWORD'] = os.environ.get('EMAIL_PASS')
 mail = Mail(app)
 
 from web import urls
+from web.models.User import normalize_stored_emails
 db.create_all()
-info_logger.info('Data Base constructed')
\ No newline at end of file
+info_logger.info('Data Base constructed')
+# lookups lowercase the typed email, so bring emails stored before that in line
+normalize_stored_emails()
\ No newline at end of file
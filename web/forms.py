@@ -4,14 +4,14 @@ from wtforms import StringField, EmailField, PasswordField, SubmitField, Integer
 from wtforms.validators import DataRequired, Length, EqualTo, ValidationError, NumberRange, Email
 from flask_login import current_user
 from logger import info_logger, error_logger
-from .models.User import User 
+from .models.User import User, normalize_email
 
 class RegistrationForm(FlaskForm):
     """
     Creates a form to register new users
     """
     name = StringField('Name', validators=[DataRequired(), Length(min=2, max=20)])
-    email = EmailField('Email', validators=[DataRequired(), Email()])
+    email = EmailField('Email', filters=[normalize_email], validators=[DataRequired(), Email()])
     password = PasswordField('Password', validators=[DataRequired()])
     confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Sign Up')
@@ -36,7 +36,7 @@ class LoginForm(FlaskForm):
     """
     Creates a form to login users
     """
-    email = EmailField('Email', validators=[DataRequired(), Email()])
+    email = EmailField('Email', filters=[normalize_email], validators=[DataRequired(), Email()])
     password = PasswordField('Password', validators=[DataRequired()])
     submit = SubmitField('Login')
     info_logger.info("Login Validated")
@@ -46,7 +46,7 @@ class UpdateAccountForm(FlaskForm):
     Creates a form to update user account
     """
     name = StringField('Name', validators=[DataRequired(), Length(min=2, max=20)])
-    email = EmailField('Email', validators=[DataRequired(), Email()])
+    email = EmailField('Email', filters=[normalize_email], validators=[DataRequired(), Email()])
     picture = FileField('Update Profile Picture', validators=[FileAllowed(['jpg', 'png', 'jpeg'])])
     height = FloatField('Height (cm)', validators=[DataRequired(), NumberRange(min=0.0, max=300, message='Height must be between 0.0 and 300')])
     weight = FloatField('Weight (kg)', validators=[DataRequired(), NumberRange(min=0.0, max=300.0, message='Weight must be between 0.0 and 300.0')])
@@ -99,25 +99,9 @@ class RequestResetForm(FlaskForm):
     """
     Creates a form to request a password reset
     """
-    email = EmailField('Email', validators=[DataRequired(), Email()])
+    email = EmailField('Email', filters=[normalize_email], validators=[DataRequired(), Email()])
     submit = SubmitField('Request Password Reset')
 
-    def validate_email(self, email):
-        """
-        A custom validation function to check if the email has been used already
-
-        Params:
-            email (str): The email to be validated
-
-        Returns:
-            None
-        """
-        user = User.query.filter_by(email=email.data).first()
-        if user is None:
-            raise ValidationError('There is no account with that email. You must register first.')
-        else:
-            info_logger.info("Email Validated")
-        
 class ResetPasswordForm(FlaskForm):
     """
     Creates a form to reset a password
@@ -1,8 +1,22 @@
 from .. import db, login_manager, app
 from flask_login import UserMixin
 from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
+from sqlalchemy.orm import validates
 from logger import info_logger, error_logger
 
+def normalize_email(email):
+    """
+    Strip and lowercase an email. Used both when storing emails and when looking them up,
+    so the two always agree.
+
+    Parameters:
+    email (str): The email to normalize.
+
+    Returns:
+    str: The normalized email.
+    """
+    return email.strip().lower() if email else email
+
 @login_manager.user_loader
 def load_user(user_id):
     """
@@ -36,6 +50,7 @@ class User(db.Model, UserMixin):
     updated_at (datetime): The date and time the user was last updated.
     is_active (bool): Whether the user is active or not.
     weights (list): A list of the UserWeightOverTime objects associated with the user.
+    is_profile_complete (bool): Whether the user has filled in all their account details.
 
     Methods:
     get_reset_token(expires_sec=1800):
@@ -51,7 +66,7 @@ class User(db.Model, UserMixin):
     __tablename__ = 'user'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.Text, nullable=False)
-    email = db.Column(db.Text, nullable=False)
+    email = db.Column(db.Text, unique=True, index=True, nullable=False)
     password = db.Column(db.Text, nullable=False)
     image_file = db.Column(db.Text, nullable=False, default='default.jpg')
     weight = db.Column(db.Integer, nullable=True)
@@ -65,6 +80,20 @@ class User(db.Model, UserMixin):
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     weights = db.relationship('UserWeightOverTime', backref='user', lazy=True)
 
+    @validates('email')
+    def validate_email(self, key, email):
+        """
+        Store emails normalized so lookups don't depend on the case they were entered in.
+
+        Parameters:
+        key (str): The name of the attribute being set.
+        email (str): The email being set.
+
+        Returns:
+        str: The normalized email.
+        """
+        return normalize_email(email)
+
     def get_reset_token(self, expires_sec=1800):
         """
         Get a reset token for the user.
@@ -109,6 +138,16 @@ class User(db.Model, UserMixin):
         # return user id as unicode
         return str(self.id)
 
+    @property
+    def is_profile_complete(self):
+        """
+        Check whether the user has filled in all the details needed to calculate their calories.
+
+        Returns:
+        bool: True if height, weight, age, goal, activity level and gender are all set.
+        """
+        return all((self.height, self.weight, self.age, self.goal, self.activity_level, self.gender))
+
     @property
     def get_bmi(self):
         """
@@ -126,4 +165,35 @@ class User(db.Model, UserMixin):
         Returns:
         str: The string representation of the User object.
         """
-        return f"User('{self.name}', '{self.email}')"
\ No newline at end of file
+        return f"User('{self.name}', '{self.email}')"
+
+def normalize_stored_emails():
+    """
+    Normalize the emails of users stored before emails were lowercased, so they can still log in
+    and reset their password. Runs at startup and does nothing once every email is normalized.
+
+    If several accounts only differ by the case of their email, the oldest one gets the normalized
+    email and the others are left unchanged (the email column is unique) and logged as errors.
+    Those accounts can't be found by login or password reset until they are merged by hand.
+
+    Returns:
+    int: The number of emails that were normalized.
+    """
+    users = User.query.filter(User.email != db.func.lower(db.func.trim(User.email))).order_by(User.id).all()
+    if not users:
+        return 0
+
+    normalized_emails = {normalize_email(user.email) for user in users}
+    taken = {email for email, in db.session.query(User.email).filter(User.email.in_(normalized_emails))}
+    updated = 0
+    for user in users:
+        email = normalize_email(user.email)
+        if email in taken:
+            error_logger.error(f"Cannot normalize the email of user {user.id}, {email} is already used by another account")
+            continue
+        user.email = email
+        taken.add(email)
+        updated += 1
+    db.session.commit()
+    info_logger.info(f"Normalized {updated} stored emails")
+    return updated
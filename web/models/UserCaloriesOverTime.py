@@ -15,6 +15,8 @@ class UserCaloriesOverTime(db.Model):
     """
 
     __tablename__ = 'user_calories_over_time'
+    # the charts filter by user and a created_at range, so index both together
+    __table_args__ = (db.Index('ix_%s_user_created' % __tablename__, 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     calories = db.Column(db.Integer, nullable=False)
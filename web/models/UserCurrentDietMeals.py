@@ -15,7 +15,8 @@ class UserCurrentDietMeals(db.Model):
         updated_at (datetime): The timestamp of when this association was last updated.
         serving_size (int): The serving size of this meal for this user's current diet.
         user_current_diet (UserCurrentDiet): The UserCurrentDiet object associated with this meal.
-        meal (Meals): The Meals object associated with this diet.
+        meal (Meals): The Meals object associated with this diet, eagerly loaded with a join.
+        label (MealsLabel): The MealsLabel object of the meal, eagerly loaded with a join.
     """
     __tablename__ = 'user_current_diet_meals'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -25,7 +26,9 @@ class UserCurrentDietMeals(db.Model):
     updated_at = db.Column(db.TIMESTAMP, default=db.func.current_timestamp())
     serving_size = db.Column(db.Integer, nullable=False)
     user_current_diet = db.relationship('UserCurrentDiet', backref='user_current_diet_meals')
-    meal = db.relationship('Meals', backref='user_current_diet_meals')
+    meal = db.relationship('Meals', backref='user_current_diet_meals', lazy='joined')
+    label = db.relationship('MealsLabel', primaryjoin='UserCurrentDietMeals.meal_id == MealsLabel.id',
+                            foreign_keys=[meal_id], viewonly=True, lazy='joined')
 
     def __repr__(self):
         return f"UserCurrentDietMeals('{self.id}', '{self.meal_id}')"
@@ -1,13 +1,20 @@
 import datetime
 import secrets
 import os
+import tempfile
 from PIL import Image
-from flask import render_template, request, redirect, url_for, flash
-from web import app, db, bcrypt, mail
+from werkzeug.datastructures import FileStorage
+from flask import render_template, request, redirect, url_for, flash, g
+from web import app, db, bcrypt, mail, password_hasher
 from web.forms import RegistrationForm, LoginForm, UpdateAccountForm, CalculateCalories, RequestResetForm, ResetPasswordForm, WeightTimeFilterForm, CaloriesTimeFilterForm
 from flask_login import login_user, current_user, logout_user, login_required
+from sqlalchemy.orm import load_only
+from sqlalchemy.dialects import postgresql
 from web.meal_planner import choose_meals_for_user
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from argon2.exceptions import VerificationError, InvalidHash
 from flask_mail import Message
 from logger import info_logger, error_logger
 from .models.User import User 
@@ -21,6 +28,92 @@ from .models.DietCalories import DietCalories
 from .models.UserWeightOverTime import UserWeightOverTime
 from .models.UserCaloriesOverTime import UserCaloriesOverTime
 
+# number of days covered by each time frame offered in the calories and weight filter forms
+TIME_FRAME_DAYS = {
+    '1 Week': 7,
+    '2 Weeks': 14,
+    '3 Weeks': 21,
+    '1 Month': 30,
+    '3 Months': 90,
+    '6 Months': 180,
+    '1 Year': 365
+}
+
+# upper bound on the number of points drawn in a chart over time
+MAX_CHART_POINTS = 5000
+
+# password hashing is CPU bound, so it runs on a small dedicated pool instead of the request thread
+password_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='password-hash')
+# profile pictures are decoded and thumbnailed in the background so the account page returns quickly
+picture_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='picture')
+
+def _is_legacy_hash(hashed_password):
+    """
+    Checks if a stored password hash was made with bcrypt rather than Argon2id
+
+    Params:
+        hashed_password (str): The stored password hash
+
+    Returns:
+        bool: True if the hash is a bcrypt hash
+    """
+    return hashed_password.startswith('$2')
+
+def _hash_password(password):
+    """
+    Hashes a password with Argon2id on the password executor
+
+    Params:
+        password (str): The plain text password
+
+    Returns:
+        hashed_password (str): The Argon2id hash of the password
+    """
+    return password_executor.submit(password_hasher.hash, password).result()
+
+def _verify_password(hashed_password, password):
+    """
+    Verifies a password against an Argon2id hash
+
+    Params:
+        hashed_password (str): The stored Argon2id hash
+        password (str): The plain text password to check
+
+    Returns:
+        bool: True if the password matches the hash
+    """
+    try:
+        return password_hasher.verify(hashed_password, password)
+    except (VerificationError, InvalidHash):
+        return False
+
+def _check_password(hashed_password, password):
+    """
+    Checks a password against its stored hash on the password executor.
+    Legacy bcrypt hashes are still accepted so existing users can log in
+
+    Params:
+        hashed_password (str): The stored bcrypt or Argon2id hash
+        password (str): The plain text password to check
+
+    Returns:
+        bool: True if the password matches the hash
+    """
+    if _is_legacy_hash(hashed_password):
+        return password_executor.submit(bcrypt.check_password_hash, hashed_password, password).result()
+    return password_executor.submit(_verify_password, hashed_password, password).result()
+
+def _get_user_calories():
+    """
+    Gets the UserCalories record of the current user, querying the database at most once per request
+
+    Returns:
+        user_calories (UserCalories): The calories record of the current user, or None if there is none
+    """
+    if not hasattr(g, 'user_calories'):
+        g.user_calories = UserCalories.query.filter_by(user_id=current_user.id).first()
+    return g.user_calories
+
 def account_complete(f):
     """
     Define a decorator to check if the user has completed their account details.
@@ -29,7 +122,7 @@ def account_complete(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if current_user.is_authenticated:
-            if not (current_user.height and current_user.weight and current_user.age and current_user.goal and current_user.activity_level and current_user.gender):
+            if not current_user.is_profile_complete:
                 flash('Please complete your account details.', 'warning')
                 return redirect(url_for('finish_account'))
         info_logger.info("User authenticated")
@@ -56,7 +149,7 @@ def register():
         info_logger.info("User not authenticated")
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        hashed_password = _hash_password(form.password.data)
         user = User(name=form.name.data, email=form.email.data, password=hashed_password)
         db.session.add(user)
         db.session.commit()
@@ -76,11 +169,18 @@ def login():
         return redirect(url_for('index'))
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        # only load the columns needed to check the password, log the user in (is_active) and check the account completion
+        user = User.query.options(load_only('id', 'password', 'is_active', 'height', 'weight', 'age', 'goal', 'activity_level', 'gender')) \
+            .filter_by(email=form.email.data) \
+            .one_or_none()
+        if user and _check_password(user.password, form.password.data):
+            # upgrade bcrypt or outdated Argon2id hashes now that we have the plain text password
+            if _is_legacy_hash(user.password) or password_hasher.check_needs_rehash(user.password):
+                user.password = _hash_password(form.password.data)
+                db.session.commit()
             login_user(user)
             # check if the account is not complete and prompt them to finish it
-            if not (current_user.height and current_user.weight and current_user.age and current_user.goal and current_user.activity_level and current_user.gender):
+            if not current_user.is_profile_complete:
                 flash('Please complete your account details.', 'warning')
                 return redirect(url_for('finish_account'))
             
@@ -113,7 +213,7 @@ def finish_account():
     """
     Creates the account completion form and handles the POST request
     """
-    if UserCalories.query.filter_by(user_id=current_user.id).first():
+    if _get_user_calories():
         return redirect(url_for('index'))
     form = CalculateCalories()
     if form.validate_on_submit():
@@ -150,11 +250,55 @@ def save_picture(form_picture):
     picture_fn = random_hex + f_ext
     picture_path = os.path.join(app.root_path, 'static/images', picture_fn)
     output_size = (125, 125)
+    form_picture.stream.seek(0)
     i = Image.open(form_picture)
-    i.thumbnail(output_size)
-    i.save(picture_path)
+    i.thumbnail(output_size, Image.Resampling.LANCZOS)
+    i.save(picture_path, optimize=True, quality=85)
     return picture_fn
 
+def _store_picture(upload_path, user_id):
+    """
+    Thumbnails an uploaded picture and sets it as the user's profile picture.
+    Runs on the picture executor, outside of the request
+
+    Params:
+        upload_path: the temporary file the upload was written to
+        user_id: the ID of the user who uploaded the picture
+
+    Returns:
+        None
+    """
+    try:
+        with open(upload_path, 'rb') as upload:
+            picture_file = save_picture(FileStorage(stream=upload, filename=upload_path))
+        with app.app_context():
+            user = User.query.get(user_id)
+            user.image_file = picture_file
+            db.session.commit()
+        info_logger.info("Profile picture updated")
+    except Exception:
+        error_logger.exception("Saving the profile picture failed")
+    finally:
+        os.remove(upload_path)
+
+def queue_picture(form_picture, user_id):
+    """
+    Writes the uploaded picture to a temporary file and queues it to be thumbnailed.
+    The user keeps their current picture until the new one is ready
+
+    Params:
+        form_picture: the picture uploaded by the user
+        user_id: the ID of the user who uploaded the picture
+
+    Returns:
+        None
+    """
+    _, f_ext = os.path.splitext(form_picture.filename)
+    fd, upload_path = tempfile.mkstemp(suffix=f_ext)
+    with os.fdopen(fd, 'wb') as upload:
+        form_picture.save(upload)
+    picture_executor.submit(_store_picture, upload_path, user_id)
+
 
 @app.route('/account', methods=['GET', 'POST'])
 @login_required
@@ -170,8 +314,7 @@ def account():
         current_user.name = form.name.data
         current_user.email = form.email.data
         if form.picture.data:
-            picture_file = save_picture(form.picture.data)
-            current_user.image_file = picture_file
+            queue_picture(form.picture.data, current_user.id)
 
         weight_changed = False
         # add to the UserWeightOverTime table if the user has updated their height or weight
@@ -204,6 +347,22 @@ def account():
         if current_user.gender: form.gender.data = current_user.gender
     return render_template('account.html', title='Account', form=form, image_file=image_file)
 
+# multiplier applied to the BMR for each activity level
+ACTIVITY_MULTIPLIERS = {
+    'Sedentary': 1.2,
+    'Lightly Active': 1.375,
+    'Moderately Active': 1.55,
+    'Very Active': 1.725,
+    'Extra Active': 1.9
+}
+
+# daily calorie adjustment for each goal
+GOAL_ADJUSTMENTS = {
+    'Lose Weight': -500,
+    'Maintain Weight': 0,
+    'Gain Weight': 500
+}
+
 # separated so it can be tested easily with unittest
 def calculate_calories(current_user):
     """
@@ -217,31 +376,38 @@ def calculate_calories(current_user):
     """
     if current_user.gender == 'Male':
         BMR = 66.47 + (13.75 * current_user.weight) + (5.003 * current_user.height) - (6.755 * current_user.age)
-    if current_user.gender == 'Female':
+    elif current_user.gender == 'Female':
         BMR = 655.1 + (9.563 * current_user.weight) + (1.85 * current_user.height) - (4.676 * current_user.age)
-    
-    if current_user.activity_level == 'Sedentary':
-        AMR = BMR * 1.2
-    elif current_user.activity_level == 'Lightly Active':
-        AMR = BMR * 1.375
-    elif current_user.activity_level == 'Moderately Active':
-        AMR = BMR * 1.55
-    elif current_user.activity_level == 'Very Active':
-        AMR = BMR * 1.725
-    elif current_user.activity_level == 'Extra Active':
-        AMR = BMR * 1.9
-
-    if current_user.goal == 'Lose Weight':
-        calories = AMR - 500
-    elif current_user.goal == 'Maintain Weight':
-        calories = AMR
-    elif current_user.goal == 'Gain Weight':
-        calories = AMR + 500
-    
-    calories = round(calories)
+    else:
+        raise ValueError(f"Unknown gender: {current_user.gender}")
+
+    calories = round(BMR * ACTIVITY_MULTIPLIERS[current_user.activity_level] + GOAL_ADJUSTMENTS[current_user.goal])
     return calories
 
 
+def _save_user_calories(calories):
+    """
+    Creates or replaces the UserCalories record of the current user in a single statement.
+    SQLAlchemy only supports ON CONFLICT for PostgreSQL, other databases delete and insert instead
+
+    Params:
+        calories (int): The number of calories needed for the user
+
+    Returns:
+        None
+    """
+    if db.engine.dialect.name == 'postgresql':
+        stmt = postgresql.insert(UserCalories.__table__).values(user_id=current_user.id, calories=calories)
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id'],
+                                          set_={'calories': stmt.excluded.calories, 'updated_at': db.func.current_timestamp()})
+        db.session.execute(stmt)
+    else:
+        UserCalories.query.filter_by(user_id=current_user.id).delete()
+        db.session.add(UserCalories(calories=calories, user_id=current_user.id))
+    db.session.commit()
+    g.pop('user_calories', None)
+
+
 @app.route('/get-calories', methods=['GET'])
 @login_required
 @account_complete
@@ -250,11 +416,7 @@ def get_calories():
     Calculates the calories needed for the user and displays it
     """
     calories = calculate_calories(current_user)
-    if UserCalories.query.filter_by(user_id=current_user.id).first():
-        UserCalories.query.filter_by(user_id=current_user.id).delete()
-    user_calories = UserCalories(calories=calories, user_id=current_user.id)
-    db.session.add(user_calories)
-    db.session.commit()
+    _save_user_calories(calories)
     return render_template('get_calories.html', title='Get Calories', current_user=current_user, calories=calories)
     
     
@@ -265,29 +427,31 @@ def get_meals():
     """
     Gets the meals for the user based on their calories
     """
-    if not UserCalories.query.filter_by(user_id=current_user.id).first():
+    if not _get_user_calories():
         return redirect(url_for('get_calories'))
     breakfast_meal, lunch_meal, dinner_meal = choose_meals_for_user(current_user.id)
     breakfast_meal, breakfast_serving = breakfast_meal
     lunch_meal, lunch_serving = lunch_meal
     dinner_meal, dinner_serving = dinner_meal
-    if UserCurrentDiet.query.filter_by(user_id=current_user.id).first():
-        user_current_diet = UserCurrentDiet.query.filter_by(user_id=current_user.id).first()
-        UserCurrentDietMeals.query.filter_by(user_current_diet_id=user_current_diet.id).delete()
-        DietCalories.query.filter_by(user_current_diet_id=user_current_diet.id).delete()
+    user_current_diet = UserCurrentDiet.query.filter_by(user_id=current_user.id).first()
+    if user_current_diet:
+        # the deleted rows are never read back in this request, so skip syncing the session
+        UserCurrentDietMeals.query.filter_by(user_current_diet_id=user_current_diet.id).delete(synchronize_session=False)
+        DietCalories.query.filter_by(user_current_diet_id=user_current_diet.id).delete(synchronize_session=False)
     else:
         user_current_diet = UserCurrentDiet(user_id=current_user.id)
         db.session.add(user_current_diet)
-        db.session.commit()
-        
+        # flush instead of commit so the new diet gets its id within the same transaction
+        db.session.flush()
+
     user_current_meals = [
-        UserCurrentDietMeals(user_current_diet_id=user_current_diet.id, meal_id=breakfast_meal.id, serving_size=breakfast_serving),
-        UserCurrentDietMeals(user_current_diet_id=user_current_diet.id, meal_id=lunch_meal.id, serving_size=lunch_serving),
-        UserCurrentDietMeals(user_current_diet_id=user_current_diet.id, meal_id=dinner_meal.id, serving_size=dinner_serving)
+        dict(user_current_diet_id=user_current_diet.id, meal_id=breakfast_meal.id, serving_size=breakfast_serving),
+        dict(user_current_diet_id=user_current_diet.id, meal_id=lunch_meal.id, serving_size=lunch_serving),
+        dict(user_current_diet_id=user_current_diet.id, meal_id=dinner_meal.id, serving_size=dinner_serving)
     ]
-    db.session.add_all(user_current_meals)
-    diet_calories = DietCalories(user_current_diet_id=user_current_diet.id, calories=breakfast_meal.calories*breakfast_serving + lunch_meal.calories*lunch_serving + dinner_meal.calories*dinner_serving)
-    db.session.add(diet_calories)
+    db.session.bulk_insert_mappings(UserCurrentDietMeals, user_current_meals)
+    diet_calories = dict(user_current_diet_id=user_current_diet.id, calories=breakfast_meal.calories*breakfast_serving + lunch_meal.calories*lunch_serving + dinner_meal.calories*dinner_serving)
+    db.session.bulk_insert_mappings(DietCalories, [diet_calories])
     db.session.commit()
     return redirect(url_for('show_meals'))
 
@@ -298,21 +462,15 @@ def show_meals():
     """
     Shows the meals for the user that nake up a specific diet
     """
-    if UserCurrentDiet.query.filter_by(user_id=current_user.id).first():
-        user_current_diet = UserCurrentDiet.query.filter_by(user_id=current_user.id).first()
-        user_current_meals = UserCurrentDietMeals.query.filter_by(user_current_diet_id=user_current_diet.id).all()
-        meals = []
-        servings = []
-        labels=[]
-        for user_current_meal in user_current_meals:
-            meal = Meals.query.filter_by(id=user_current_meal.meal_id).first()
-            meal_id=user_current_meal.meal_id
-            label=MealsLabel.query.filter_by(id=meal_id).first()
-            meal_type=label.label
-            serving_size = user_current_meal.serving_size
-            servings.append(serving_size)
-            meals.append(meal)
-            labels.append(label)
+    user_current_diet = UserCurrentDiet.query.filter_by(user_id=current_user.id).first()
+    if user_current_diet:
+        # the meal and label relationships are joined-loaded, so this is a single query
+        user_current_meals = UserCurrentDietMeals.query.filter_by(user_current_diet_id=user_current_diet.id) \
+            .order_by(UserCurrentDietMeals.id) \
+            .all()
+        servings = [user_current_meal.serving_size for user_current_meal in user_current_meals]
+        meals = [user_current_meal.meal for user_current_meal in user_current_meals]
+        labels = [user_current_meal.label for user_current_meal in user_current_meals]
         diet_calories = DietCalories.query.filter_by(user_current_diet_id=user_current_diet.id).first()
 
         return render_template('show_meals.html',
@@ -334,8 +492,12 @@ def save_calories():
     """
     For the diet the user chose, save the calories to the database to track over time
     """
-    user_current_diet = UserCurrentDiet.query.filter_by(user_id=current_user.id).first()
-    calories = DietCalories.query.filter_by(user_current_diet_id=user_current_diet.id).first()
+    # fetch the diet calories through the user's current diet in a single query
+    calories = DietCalories.query.join(UserCurrentDiet, UserCurrentDiet.id == DietCalories.user_current_diet_id) \
+        .filter(UserCurrentDiet.user_id == current_user.id) \
+        .first()
+    if calories is None:
+        return redirect(url_for('get_meals'))
 
     # populate the user calories over time table to track and then later plot it over time
     user_calories_over_time = UserCaloriesOverTime(calories=calories.calories, user_id=current_user.id)
@@ -344,6 +506,35 @@ def save_calories():
     flash('You chose a great meal plan for today!', 'success')
     return redirect(url_for('index'))
 
+def _chart_points(date_column, value_column, *criteria):
+    """
+    Gets the labels and values for a chart over time, capped at the MAX_CHART_POINTS most recent points.
+    Only the two charted columns are selected, and the rows are streamed instead of loaded all at once
+
+    Params:
+        date_column: The timestamp column used for the labels
+        value_column: The column used for the values
+        criteria: The filters selecting the rows to chart
+
+    Returns:
+        labels (list): The dates of the points, oldest first
+        values (list): The values of the points, oldest first
+    """
+    rows = db.session.query(date_column, value_column) \
+        .filter(*criteria) \
+        .order_by(date_column.desc()) \
+        .limit(MAX_CHART_POINTS) \
+        .yield_per(500)
+    labels = []
+    values = []
+    for created_at, value in rows:
+        labels.append(created_at.strftime("%m/%d"))
+        values.append(value)
+    # the newest points were fetched first so the cap never drops them, the chart goes oldest first
+    labels.reverse()
+    values.reverse()
+    return labels, values
+
 @app.route('/show-calories', methods=['GET', 'POST'])
 @login_required
 @account_complete
@@ -354,7 +545,7 @@ def show_calories(time_frame=None):
     """
     
     # the user doesn't have any meals chosen yet, so redirect them to the get meals page
-    if not UserCalories.query.filter_by(user_id=current_user.id).first():
+    if not _get_user_calories():
         flash('Please choose your meals first', 'danger')
         return redirect(url_for('show-meals'))
     
@@ -363,27 +554,22 @@ def show_calories(time_frame=None):
         time_frame = form.time.data
     if time_frame is None:
         time_frame = '1 Week'
-        calories = UserCaloriesOverTime.query.filter_by(user_id=current_user.id).filter(UserCaloriesOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=7)).all()
-    elif time_frame == '1 Week':
-        calories = UserCaloriesOverTime.query.filter_by(user_id=current_user.id).filter(UserCaloriesOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=7)).all()
-    elif time_frame == '2 Weeks':
-        calories = UserCaloriesOverTime.query.filter_by(user_id=current_user.id).filter(UserCaloriesOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=14)).all()
-    elif time_frame == '3 Weeks':
-        calories = UserCaloriesOverTime.query.filter_by(user_id=current_user.id).filter(UserCaloriesOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=21)).all()
-    elif time_frame == '1 Month':
-        calories = UserCaloriesOverTime.query.filter_by(user_id=current_user.id).filter(UserCaloriesOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=30)).all()
-
-    labels = []
-    values = []
-    for cl in calories:
-        labels.append(cl.created_at.strftime("%m/%d"))
-        values.append(cl.calories)
-
-    recommended_intake = UserCalories.query.filter_by(user_id=current_user.id).first().calories
-    if len(values) == 0:
+    # created_at defaults to the database's CURRENT_TIMESTAMP, which is in UTC
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=TIME_FRAME_DAYS.get(time_frame, 7))
+    in_time_frame = (UserCaloriesOverTime.user_id == current_user.id,
+                     UserCaloriesOverTime.created_at >= cutoff)
+
+    # let the database compute the average, and skip fetching the rows if there are none
+    average, count = db.session.query(db.func.avg(UserCaloriesOverTime.calories), db.func.count(UserCaloriesOverTime.id)) \
+        .filter(*in_time_frame) \
+        .one()
+    if count == 0:
         flash('You have not entered any calories in this period', 'danger')
         return redirect(url_for('show-calories'))
-    averaged = round(sum(values) / len(values))
+    averaged = round(average)
+
+    labels, values = _chart_points(UserCaloriesOverTime.created_at, UserCaloriesOverTime.calories, *in_time_frame)
+    recommended_intake = _get_user_calories().calories
 
     return render_template('calories_over_time.html', title='Calories Over Time', time_frame=time_frame, labels=labels, values=values, form=form, recommended_intake=recommended_intake, averaged=averaged)
 
@@ -401,34 +587,35 @@ def show_weight(time_frame=None):
     if form.validate_on_submit():
         time_frame = form.time.data
     if time_frame is None:
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=30)).all()
         time_frame = '1 Month'
-    elif time_frame == '1 Week':
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=7)).all()
-    elif time_frame == '2 Weeks':
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=14)).all()
-    elif time_frame == '3 Weeks':
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=21)).all()
-    elif time_frame == '1 Month':
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=30)).all()
-    elif time_frame == '3 Months':
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=90)).all()
-    elif time_frame == '6 Months':
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=180)).all()
-    elif time_frame == '1 Year':
-        weights = UserWeightOverTime.query.filter_by(user_id=current_user.id).filter(UserWeightOverTime.created_at >= datetime.datetime.now() - datetime.timedelta(days=365)).all()
-
-
-    labels = []
-    values = []
-    for weight in weights:
-        labels.append(weight.created_at.strftime("%m/%d"))
-        values.append(weight.weight)
+    # created_at defaults to the database's CURRENT_TIMESTAMP, which is in UTC
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=TIME_FRAME_DAYS.get(time_frame, 30))
+    labels, values = _chart_points(UserWeightOverTime.created_at, UserWeightOverTime.weight,
+                                   UserWeightOverTime.user_id == current_user.id,
+                                   UserWeightOverTime.created_at >= cutoff)
 
     return render_template('weight_over_time.html', title='weight Over Time', time_frame=time_frame, labels=labels, values=values, form=form)
     
 
 
+def _send_email(app, msg):
+    """
+    Sends an email inside an application context. Runs on a background thread
+
+    Params:
+        app: The Flask application
+        msg: The message to send
+
+    Returns:
+        None
+    """
+    with app.app_context():
+        try:
+            mail.send(msg)
+            info_logger.info("Email sent")
+        except Exception:
+            error_logger.exception("Sending the email failed")
+
 def send_reset_email(user):
     """
     Sends an email to the user with a link to reset their password
@@ -444,7 +631,8 @@ def send_reset_email(user):
 
     msg.body = f"To reset your password, visit the following link : {url_for('reset_token', token=token, _external=True)} If you did not make this request then simply ignore this email and no changes will be made."
 
-    mail.send(msg)
+    # send from a background thread so the request doesn't wait on the SMTP server
+    Thread(target=_send_email, args=(app, msg), daemon=True).start()
 
 @app.route('/reset-password', methods=['GET', 'POST'])
 def reset_request():
@@ -455,9 +643,11 @@ def reset_request():
         return redirect(url_for('index'))
     form = RequestResetForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
-        send_reset_email(user)
-        flash('An email has been sent with instructions to reset your password.', 'info')
+        user = User.query.filter_by(email=form.email.data).one_or_none()
+        # show the same message either way so the form doesn't reveal which emails have an account
+        if user:
+            send_reset_email(user)
+        flash('If an account exists for that email, an email has been sent with instructions to reset your password.', 'info')
         return redirect(url_for('login'))
     return render_template('reset_request.html', title='Reset Password', form=form)
 
@@ -480,7 +670,7 @@ def reset_token(token):
         return redirect(url_for('reset_request'))
     form = ResetPasswordForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        hashed_password = _hash_password(form.password.data)
         user.password = hashed_password
         db.session.commit()
         flash('Your password has been updated! You are now able to log in', 'success')